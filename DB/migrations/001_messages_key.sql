@@ -0,0 +1,16 @@
+-- Для баз, созданных до уникального ключа messages(user_id, server_id).
+-- Без него upsert в /message/save и /message/save_bulk падает на ON CONFLICT.
+-- Запуск: docker compose exec -T db psql -U "$POSTGRES_USER" -d "$POSTGRES_DB" < DB/migrations/001_messages_key.sql
+
+BEGIN;
+
+-- из дублей по (user_id, server_id) остаётся последняя запись
+DELETE FROM messages a
+    USING messages b
+    WHERE a.user_id = b.user_id
+      AND a.server_id = b.server_id
+      AND a.id < b.id;
+
+ALTER TABLE messages ADD CONSTRAINT uq_messages_user_server UNIQUE (user_id, server_id);
+
+COMMIT;
@@ -0,0 +1,34 @@
+-- Для баз, созданных до перехода на Discord id как первичные ключи: убирает id SERIAL
+-- и приводит таблицы к DB/init.sql. Выполняется после 001_messages_key.sql.
+-- Запуск: docker compose exec -T db psql -U "$POSTGRES_USER" -d "$POSTGRES_DB" < DB/migrations/002_natural_keys.sql
+
+BEGIN;
+
+-- внешние ключи опираются на UNIQUE(discord_id), их пересоздаём после смены ключей
+ALTER TABLE messages
+    DROP CONSTRAINT messages_user_id_fkey,
+    DROP CONSTRAINT messages_server_id_fkey;
+
+-- строки без пары (user_id, server_id) не попадут в первичный ключ
+DELETE FROM messages WHERE user_id IS NULL OR server_id IS NULL;
+
+ALTER TABLE messages
+    DROP COLUMN id,
+    DROP CONSTRAINT IF EXISTS uq_messages_user_server,
+    ADD PRIMARY KEY (user_id, server_id);
+
+ALTER TABLE users
+    DROP COLUMN id,
+    DROP CONSTRAINT users_discord_id_key,
+    ADD PRIMARY KEY (discord_id);
+
+ALTER TABLE servers
+    DROP COLUMN id,
+    DROP CONSTRAINT servers_discord_id_key,
+    ADD PRIMARY KEY (discord_id);
+
+ALTER TABLE messages
+    ADD CONSTRAINT messages_user_id_fkey FOREIGN KEY (user_id) REFERENCES users(discord_id) ON DELETE CASCADE,
+    ADD CONSTRAINT messages_server_id_fkey FOREIGN KEY (server_id) REFERENCES servers(discord_id) ON DELETE CASCADE;
+
+COMMIT;
@@ -1,26 +1,49 @@
-import json
 import os
+import sys
 import time
 import secrets
+import hashlib
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Depends, HTTPException, Response, Request
-from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Text, ForeignKey
+from fastapi import FastAPI, Depends, HTTPException, Header, Response, Request
+from sqlalchemy import create_engine, update, Column, BigInteger, String, Text, ForeignKey
 from sqlalchemy.orm import sessionmaker, declarative_base, Session
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import OperationalError
 import aiohttp
-from pydantic import BaseModel
+import orjson
+from yarl import URL
+from redis.asyncio import Redis
+from pydantic import BaseModel, ConfigDict, Field
 from loguru import logger
 import dotenv
 from authlib.integrations.starlette_client import OAuth
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from starlette.responses import RedirectResponse
 from starlette.middleware.sessions import SessionMiddleware
 
 dotenv.load_dotenv(dotenv_path="../.env")
+
+logger.remove()
+logger.add(sys.stderr, level=os.getenv("LOG_LEVEL", "INFO"), enqueue=True)
+
 BOT_API_URL = os.getenv("BOT_API_URL")
 GUARD_AUTH_CLIENT_ID = os.getenv("GUARD_AUTH_CLIENT_ID")
 GUARD_AUTH_CLIENT_SECRET = os.getenv("GUARD_AUTH_CLIENT_SECRET")
 REDIRECT_URI = os.getenv("REDIRECT_URI")
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+SESSION_TTL = int(os.getenv("SESSION_TTL", 600))
+GUILDS_CACHE_TTL = int(os.getenv("GUILDS_CACHE_TTL", 30))
+
+BOT_HEALTH = URL(BOT_API_URL) / "health"
+BOT_OVERHAUL = URL(BOT_API_URL) / "overhaul_guilds"
+BOT_SEND = URL(BOT_API_URL) / "send_message"
+
+DISCORD_ME = URL("https://discord.com/api/users/@me")
+
+# проверка бота должна укладываться в 3-секундный таймаут клиента
+BOT_HEALTH_TIMEOUT = aiohttp.ClientTimeout(total=2)
 
 oauth = OAuth()
 oauth.register(
@@ -30,12 +53,12 @@ oauth.register(
     authorize_url='https://discord.com/api/oauth2/authorize',
     access_token_url='https://discord.com/api/oauth2/token',
     client_kwargs={
-        'scope': 'identify guilds',
+        'scope': 'identify',
         'response_type': 'code'
     },
 )
 
-sessions = {}
+redis = Redis.from_url(REDIS_URL, decode_responses=True)
 
 
 class Database:
@@ -43,24 +66,44 @@ class Database:
     POSTGRES_USER = os.getenv("POSTGRES_USER")
     POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD")
 
-    DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@db:5432/{POSTGRES_DB}"
+    DATABASE_URL = f"postgresql+psycopg2://{POSTGRES_USER}:{POSTGRES_PASSWORD}@db:5432/{POSTGRES_DB}"
+
+    POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 20))
+    MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 30))
 
     Base = declarative_base()
 
+    _engine = None
+
     def __init__(self):
-        self.init_engine = self.new_engine
+        self.init_engine = self.engine
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.init_engine)
         logger.success("Database initialized")
 
     @property
     def new_engine(self):
-        return create_engine(Database.DATABASE_URL)
+        return create_engine(
+            Database.DATABASE_URL,
+            pool_size=Database.POOL_SIZE,
+            max_overflow=Database.MAX_OVERFLOW,
+            pool_pre_ping=True,
+            pool_recycle=3600,
+            pool_timeout=5,
+            insertmanyvalues_page_size=1000,
+            future=True,
+        )
+
+    @property
+    def engine(self):
+        # один пул соединений на процесс
+        if Database._engine is None:
+            Database._engine = self.new_engine
+        return Database._engine
 
     def wait_for_db(self, max_retries=5, retry_delay=5):
         for attempt in range(max_retries):
             try:
-                eng = self.new_engine
-                with eng.connect():
+                with self.engine.connect():
                     logger.success("Database connection successful!")
                     return
             except OperationalError:
@@ -75,23 +118,20 @@ class Database:
 
 class Server(Database.Base):
     __tablename__ = "servers"
-    id = Column(Integer, primary_key=True)
-    discord_id = Column(BigInteger, unique=True)
+    discord_id = Column(BigInteger, primary_key=True, autoincrement=False)
     name = Column(String)
 
 
 class User(Database.Base):
     __tablename__ = "users"
-    id = Column(Integer, primary_key=True)
-    discord_id = Column(BigInteger, unique=True)
+    discord_id = Column(BigInteger, primary_key=True, autoincrement=False)
     username = Column(String)
 
 
 class Message(Database.Base):
     __tablename__ = "messages"
-    id = Column(Integer, primary_key=True)
-    user_id = Column(BigInteger, ForeignKey("users.discord_id"))
-    server_id = Column(BigInteger, ForeignKey("servers.discord_id"))
+    user_id = Column(BigInteger, ForeignKey("users.discord_id"), primary_key=True)
+    server_id = Column(BigInteger, ForeignKey("servers.discord_id"), primary_key=True)
     content = Column(Text, default='Default message')
 
 
@@ -99,7 +139,19 @@ database = Database()
 database.wait_for_db()
 database.create_all_models()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # общий HTTP-клиент для Discord API и бота, чтобы переиспользовать соединения
+    app.state.http = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=75),
+        json_serialize=lambda obj: orjson.dumps(obj).decode(),
+    )
+    yield
+    await app.state.http.close()
+    await redis.aclose()
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.add_middleware(
     SessionMiddleware,
     secret_key=os.getenv("SESSION_SECRET"),
@@ -116,32 +168,52 @@ app.add_middleware(
 )
 
 
+def get_http(request: Request) -> aiohttp.ClientSession:
+    return request.app.state.http
+
+
 @app.get("/test/health")
-async def health_check():
-    return Response(
-        status_code=200,
-        content=json.dumps({
+async def health_check(if_none_match: str | None = Header(None)):
+    return etag_response(
+        content={
             "status": "ok"
-        }),
+        },
+        if_none_match=if_none_match,
     )
 
 
 @app.get("/test/test_bot")
-async def test_bot():
+async def test_bot(http: aiohttp.ClientSession = Depends(get_http)):
+    try:
+        async with http.get(BOT_HEALTH) as response:
+            return Response(
+                status_code=response.status,
+                content=await response.read(),
+                media_type="application/json",
+            )
+    except Exception as e:
+        logger.error(f"error in bot health testing:\n{e}")
+        return ORJSONResponse(
+            status_code=500,
+            content={"status": "error", "error": str(e)},
+        )
+
+
+@app.get("/test/status")
+async def status_check(http: aiohttp.ClientSession = Depends(get_http)):
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f"{BOT_API_URL}/health") as response:
-                content = await response.text()
-                status = response.status
-                content = content
+        async with http.get(BOT_HEALTH, timeout=BOT_HEALTH_TIMEOUT) as response:
+            bot_status = "OK" if response.status == 200 else "Error"
     except Exception as e:
         logger.error(f"error in bot health testing:\n{e}")
-        status = 500
-        content = json.dumps({"status": "error", "error": str(e)})
+        bot_status = "Unavailable"
 
-    return Response(
-        status_code=status,
-        content=content,
+    return ORJSONResponse(
+        status_code=200,
+        content={
+            "backend": "OK",
+            "bot": bot_status
+        },
     )
 
 
@@ -167,7 +239,11 @@ async def login_via_discord(request: Request):
 
 
 @app.get("/auth/callback")
-async def auth_callback(request: Request, db: Session = Depends(get_db)):
+async def auth_callback(
+        request: Request,
+        db: Session = Depends(get_db),
+        http: aiohttp.ClientSession = Depends(get_http),
+):
     try:
         state = request.query_params.get("state")
         code = request.query_params.get("code")
@@ -186,46 +262,34 @@ async def auth_callback(request: Request, db: Session = Depends(get_db)):
         token = await oauth.discord.authorize_access_token(request)
         logger.info("Successfully obtained access token")
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                    "https://discord.com/api/users/@me",
-                    headers={"Authorization": f"Bearer {token['access_token']}"}
-            ) as resp:
-                if resp.status != 200:
-                    raise HTTPException(status_code=resp.status, detail="Failed to fetch user data")
-                user_data = await resp.json()
+        async with http.get(
+                DISCORD_ME,
+                headers={"Authorization": f"Bearer {token['access_token']}"}
+        ) as resp:
+            if resp.status != 200:
+                raise HTTPException(status_code=resp.status, detail="Failed to fetch user data")
+            user_data = await resp.json(loads=orjson.loads)
 
         user_id = int(user_data['id'])
 
-        user = db.query(User).filter_by(discord_id=user_id).first()
-        if not user:
-            user = User(discord_id=user_id, username=user_data['username'])
-            db.add(user)
-            db.commit()
-
-        # Сохраняем серверы пользователя
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                    "https://discord.com/api/users/@me/guilds",
-                    headers={"Authorization": f"Bearer {token['access_token']}"}
-            ) as resp:
-                if resp.status != 200:
-                    raise HTTPException(status_code=resp.status, detail="Failed to fetch guilds")
-                guilds = await resp.json()
-
-        for guild in guilds:
-            server = db.query(Server).filter_by(discord_id=guild['id']).first()
-            if not server:
-                server = Server(discord_id=guild['id'], name=guild['name'])
-                db.add(server)
-
+        db.execute(
+            insert(User)
+            .values(discord_id=user_id, username=user_data['username'])
+            .on_conflict_do_update(
+                index_elements=["discord_id"],
+                set_={"username": user_data['username']},
+            )
+        )
         db.commit()
 
-        sessions[state] = {
-            "host": request.client.host,
-            "user_id": user_id,
-            "guilds": guilds,
-        }
+        await redis.set(
+            f"sess:{state}",
+            orjson.dumps({
+                "host": request.client.host,
+                "user_id": user_id,
+            }),
+            ex=SESSION_TTL,
+        )
 
         logger.info("RedirectResponse")
         return RedirectResponse(url=f"http://localhost:3000/auth-success?state={state}")
@@ -236,47 +300,87 @@ async def auth_callback(request: Request, db: Session = Depends(get_db)):
 
 
 @app.get("/user/session")
-async def get_session(request: Request):
+async def get_session(
+        request: Request,
+        db: Session = Depends(get_db),
+        http: aiohttp.ClientSession = Depends(get_http),
+):
     state = request.query_params.get("state")
     host = request.client.host
 
-    if not state or state not in sessions:
+    if not state:
         return unauthorized_response()
 
-    session = sessions[state]
+    raw, guilds = await redis.mget(f"sess:{state}", f"sess:guilds:{state}")
+    if raw is None:
+        return unauthorized_response()
+
+    session = orjson.loads(raw)
 
     if session["host"] != host:
         return unauthorized_response()
 
-    async with aiohttp.ClientSession() as s:
+    # каждое успешное чтение продлевает сессию, иначе клиент теряет вход через SESSION_TTL
+    await redis.expire(f"sess:{state}", SESSION_TTL)
+
+    if guilds is None:
         payload = {
-            "guilds": session["guilds"],
+            "user_id": session["user_id"],
         }
-        async with s.post(f"{BOT_API_URL}/overhaul_guilds", json=payload) as response:
-            resp = await response.json()
-            logger.info(f"bot send: {response.status}, {type(resp)}, {resp}")
-            guilds = json.loads(resp['approved'])
+        async with http.post(BOT_OVERHAUL, json=payload) as response:
+            resp = await response.json(loads=orjson.loads)
+            logger.info("bot send: {}", response.status)
+            logger.debug("bot answer: {}", resp)
+            guilds = resp['approved']
+
+        # Сохраняем общие с ботом серверы пользователя по карте id -> имя, не разбирая guilds
+        if names := resp.get('names'):
+            db.execute(
+                insert(Server)
+                .values([{"discord_id": int(guild_id), "name": name} for guild_id, name in names.items()])
+                .on_conflict_do_nothing(index_elements=["discord_id"])
+            )
+            db.commit()
 
-    return Response(
+        await redis.set(f"sess:guilds:{state}", guilds, ex=GUILDS_CACHE_TTL)
+
+    return ORJSONResponse(
         status_code=200,
-        content=json.dumps({
+        content={
             "status": "success",
             "user_id": session["user_id"],
-            "guilds": guilds
-        })
+            # ответ бота уже в JSON, вставляем его без повторного разбора
+            "guilds": orjson.Fragment(guilds)
+        }
     )
 
 
 def unauthorized_response():
-    return Response(
+    return ORJSONResponse(
         status_code=401,
-        content=json.dumps({
+        content={
             "status": "Unauthorized"
-        })
+        }
     )
 
 
-class UserRequest(BaseModel):
+def etag_response(content, if_none_match=None):
+    """JSON-ответ с ETag; при совпадении If-None-Match отдаёт пустой 304"""
+    body = orjson.dumps(content)
+    etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if if_none_match == etag:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class RequestModel(BaseModel):
+    model_config = ConfigDict(extra="ignore", frozen=True)
+
+
+class UserRequest(RequestModel):
     user_id: int
 
 
@@ -286,37 +390,33 @@ async def user_create(
         db: Session = Depends(get_db),
 ):
     try:
-        user = db.query(User).filter_by(
-            discord_id=request.user_id
-        ).first()
-
-        if not user:
-            user = User(
-                discord_id=request.user_id,
-                username="Test"
-            )
-            db.add(user)
+        created = db.execute(
+            insert(User)
+            .values(discord_id=request.user_id, username="Test")
+            .on_conflict_do_nothing(index_elements=["discord_id"])
+        ).rowcount
 
-        db.commit()
+        if created:
+            db.commit()
 
-        return Response(
+        return ORJSONResponse(
             status_code=200,
-            content=json.dumps({
+            content={
                 "status": "success"
-            }),
+            },
         )
     except Exception as e:
         logger.error(f"Any error in login:\n{e}")
-        return Response(
+        return ORJSONResponse(
             status_code=500,
-            content=json.dumps({
+            content={
                 "status": "error",
                 "error": str(e)
-            }),
+            },
         )
 
 
-class GuildRequest(BaseModel):
+class GuildRequest(RequestModel):
     server_id: int
 
 
@@ -326,40 +426,37 @@ async def guild_create(
         db: Session = Depends(get_db),
 ):
     try:
-        server = db.query(Server).filter_by(
-            discord_id=request.server_id
-        ).first()
-
-        if not server:
-            user = Server(
-                discord_id=request.server_id,
-                name="Test"
-            )
-            db.add(user)
+        created = db.execute(
+            insert(Server)
+            .values(discord_id=request.server_id, name="Test")
+            .on_conflict_do_nothing(index_elements=["discord_id"])
+        ).rowcount
 
-        db.commit()
+        if created:
+            db.commit()
 
-        return Response(
+        return ORJSONResponse(
             status_code=200,
-            content=json.dumps({
+            content={
                 "status": "success"
-            }),
+            },
         )
     except Exception as e:
         logger.error(f"Any error in login:\n{e}")
-        return Response(
+        return ORJSONResponse(
             status_code=500,
-            content=json.dumps({
+            content={
                 "status": "error",
                 "error": str(e)
-            }),
+            },
         )
 
 
-class SaveMessageRequest(BaseModel):
+class SaveMessageRequest(RequestModel):
     user_id: int
     server_id: int
-    content: str
+    # не длиннее описания embed в Discord
+    content: str = Field(max_length=4096)
 
 
 @app.post("/message/save")
@@ -368,41 +465,79 @@ async def save_message(
         db: Session = Depends(get_db),
 ):
     try:
-        message = db.query(Message).filter_by(
-            user_id=request.user_id,
-            server_id=request.server_id
-        ).first()
-
-        if message:
-            message.content = request.content
-        else:
-            message = Message(
+        db.execute(
+            insert(Message)
+            .values(
                 user_id=request.user_id,
                 server_id=request.server_id,
                 content=request.content
             )
-            db.add(message)
-
+            .on_conflict_do_update(
+                index_elements=["user_id", "server_id"],
+                set_={"content": request.content},
+            )
+        )
         db.commit()
 
-        return Response(
+        return ORJSONResponse(
             status_code=200,
-            content=json.dumps({
+            content={
                 "status": "save"
-            }),
+            },
         )
     except Exception as e:
         logger.error(f"Any error in save message:\n{e}")
-        return Response(
+        return ORJSONResponse(
             status_code=500,
-            content=json.dumps({
+            content={
                 "status": "error",
                 "error": str(e)
-            }),
+            },
         )
 
 
-class ResetMessageRequest(BaseModel):
+class SaveMessagesRequest(RequestModel):
+    items: list[SaveMessageRequest] = Field(max_length=1000)
+
+
+@app.post("/message/save_bulk")
+async def save_messages(
+        request: SaveMessagesRequest,
+        db: Session = Depends(get_db),
+):
+    try:
+        # ON CONFLICT не может обновить одну строку дважды: оставляем последнюю запись
+        items = {(item.user_id, item.server_id): item.model_dump() for item in request.items}
+
+        if items:
+            stmt = insert(Message).values(list(items.values()))
+            db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["user_id", "server_id"],
+                    set_={"content": stmt.excluded.content},
+                )
+            )
+            db.commit()
+
+        return ORJSONResponse(
+            status_code=200,
+            content={
+                "status": "save",
+                "count": len(items)
+            },
+        )
+    except Exception as e:
+        logger.error(f"Any error in bulk save message:\n{e}")
+        return ORJSONResponse(
+            status_code=500,
+            content={
+                "status": "error",
+                "error": str(e)
+            },
+        )
+
+
+class ResetMessageRequest(RequestModel):
     user_id: int
     server_id: int
 
@@ -413,39 +548,43 @@ async def reset_message(
         db: Session = Depends(get_db)
 ):
     try:
-        message = db.query(Message).filter_by(
-            user_id=request.user_id,
-            server_id=request.server_id
-        ).first()
+        reset = db.execute(
+            update(Message)
+            .where(
+                Message.user_id == request.user_id,
+                Message.server_id == request.server_id
+            )
+            .values(content="Default message")
+            .returning(Message.user_id)
+        ).scalar()
 
-        if message:
-            message.content = "Default message"
+        if reset is not None:
             db.commit()
-            return Response(
+            return ORJSONResponse(
                 status_code=200,
-                content=json.dumps({
+                content={
                     "status": "reset"
-                }),
+                },
             )
 
-        return Response(
+        return ORJSONResponse(
             status_code=404,
-            content=json.dumps({
+            content={
                 "status": "message not found"
-            }),
+            },
         )
     except Exception as e:
         logger.error(f"Any error in resset message:\n{e}")
-        return Response(
+        return ORJSONResponse(
             status_code=500,
-            content=json.dumps({
+            content={
                 "status": "error",
                 "error": str(e)
-            }),
+            },
         )
 
 
-class SendMessageRequest(BaseModel):
+class SendMessageRequest(RequestModel):
     user_id: int
     server_id: int
     channel_id: int
@@ -455,73 +594,76 @@ class SendMessageRequest(BaseModel):
 async def send_message(
         request: SendMessageRequest,
         db: Session = Depends(get_db),
+        http: aiohttp.ClientSession = Depends(get_http),
 ):
     try:
-        message = db.query(Message).filter_by(
-            user_id=request.user_id,
-            server_id=request.server_id
-        ).first()
+        message = db.get(Message, (request.user_id, request.server_id))
 
         if not message or not message.content:
             raise HTTPException(status_code=404, detail="Message not found")
 
-        async with aiohttp.ClientSession() as session:
-            payload = {
-                "user_id": request.user_id,
-                "server_id": request.server_id,
-                "channel_id": request.channel_id,
-                "content": message.content,
-            }
-            async with session.post(f"{BOT_API_URL}/send_message", json=payload) as response:
-                resp = await response.json()
-                logger.info(f"bot send: {response.status}, {type(resp)}, {resp}")
-                return Response(
-                    status_code=response.status,
-                    content=json.dumps({
-                        "status": "success" if response.status == 200 else "error",
-                        "answer": resp
-                    })
-                )
+        payload = {
+            "user_id": request.user_id,
+            "server_id": request.server_id,
+            "channel_id": request.channel_id,
+            "content": message.content,
+        }
+        async with http.post(BOT_SEND, json=payload) as response:
+            resp = await response.json(loads=orjson.loads)
+            logger.info("bot send: {}, {}", response.status, resp)
+            return ORJSONResponse(
+                status_code=response.status,
+                content={
+                    "status": "success" if response.status == 200 else "error",
+                    "answer": resp
+                }
+            )
     except Exception as e:
         logger.error(f"Any error in sending message:\n{e}")
-        return Response(
+        return ORJSONResponse(
             status_code=500,
-            content=json.dumps({
+            content={
                 "status": "error",
                 "error": str(e)
-            }),
+            },
         )
 
 
-class GetMessageRequest(BaseModel):
+class GetMessageRequest(RequestModel):
     user_id: int
     server_id: int
 
 
 @app.get("/message/get")
 async def get_message(
-        request: GetMessageRequest,
+        request: GetMessageRequest = Depends(),
         db: Session = Depends(get_db),
+        if_none_match: str | None = Header(None),
 ):
     try:
-        message = db.query(Message).filter_by(
-            user_id=request.user_id,
-            server_id=request.server_id
-        ).first()
+        message = db.get(Message, (request.user_id, request.server_id))
+
+        if not message:
+            return ORJSONResponse(
+                status_code=404,
+                content={
+                    "status": "message not found"
+                },
+            )
 
-        return Response(
-            status_code=200,
-            content=json.dumps({
+        return etag_response(
+            content={
                 "status": "success",
                 "content": message.content
-            }),
+            },
+            if_none_match=if_none_match,
         )
     except Exception as e:
         logger.error(f"Any error in get message:\n{e}")
-        return Response(
+        return ORJSONResponse(
             status_code=500,
-            content=json.dumps({
+            content={
                 "status": "error",
                 "error": str(e)
-            }),
+            },
         )
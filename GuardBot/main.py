@@ -1,17 +1,25 @@
-import json
+import asyncio
 import os
+import signal
 import sys
-from pprint import pformat
 
 import discord
 from discord.ext import commands
+import aiohttp
 from aiohttp import web
-import requests
+import orjson
+from yarl import URL
 from loguru import logger
 import dotenv
+import uvloop
 
 dotenv.load_dotenv(dotenv_path="../.env")
+
+logger.remove()
+logger.add(sys.stderr, level=os.getenv("LOG_LEVEL", "INFO"), enqueue=True)
+
 API_URL = os.getenv("API_URL")
+MESSAGE_GET = URL(API_URL) / "message" / "get"
 
 
 class GuardBotCog(commands.Cog):
@@ -25,18 +33,20 @@ class GuardBotCog(commands.Cog):
     @discord.app_commands.command(name="msg")
     async def msg_command(self, interaction: discord.Interaction):
         try:
-            request = requests.get(
-                API_URL + "/message/get",
-                json={
-                    "user_id": interaction.user.id,
-                    "server_id": interaction.guild.id
-                }
-            ).json()
-
-            if request.status_code != 200:
-                raise Exception(f"Any error occurred: {request.status_code}")
-
-            content = request.get('content')
+            async with self.bot.http_session.get(
+                    MESSAGE_GET,
+                    params={
+                        "user_id": interaction.user.id,
+                        "server_id": interaction.guild.id
+                    }
+            ) as response:
+                data = await response.json(loads=orjson.loads)
+                status = response.status
+
+            if status != 200:
+                raise Exception(f"Any error occurred: {status}")
+
+            content = data.get('content')
             server = interaction.guild
 
             channel = server.system_channel
@@ -57,8 +67,10 @@ class GuardBotCog(commands.Cog):
             return web.json_response({"error": str(e)}, status=500)
 
     @discord.app_commands.command(name="exit")
-    async def exit_command(self, _: discord.Interaction):
-        sys.exit(0)
+    @discord.app_commands.check(lambda interaction: interaction.client.is_owner(interaction.user))
+    async def exit_command(self, interaction: discord.Interaction):
+        await interaction.response.send_message("Shutting down...", ephemeral=True)  # type: ignore
+        await self.bot.close()
 
 
 class GuardBot(commands.Bot):
@@ -69,15 +81,30 @@ class GuardBot(commands.Bot):
         intents.guilds = True
         super().__init__(command_prefix="/", intents=intents)
 
+        # кэш данных серверов для /overhaul_guilds: guild.id -> списки id и имён каналов и участников
         self.bot_guilds = dict()
 
         self.site = None
         self.runner = None
         self.app = web.Application()
 
+        # self.http уже занят HTTP-клиентом discord.py
+        self.http_session = None
+
+        # задача штатного закрытия по SIGTERM, ссылка держит её от сборщика мусора
+        self.close_task = None
+
     async def setup_hook(self):
+        self.http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=75),
+            json_serialize=lambda obj: orjson.dumps(obj).decode(),
+        )
+
         await self.add_cog(GuardBotCog(self))
 
+        # docker stop шлёт SIGTERM: закрываемся штатно, освобождая HTTP-сервер
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self.on_sigterm)
+
         logger.info("🌐 Starting HTTP server...")
         self.app.router.add_get('/health', self.health_check)
         self.app.router.add_post('/send_message', self.handle_send)
@@ -89,23 +116,69 @@ class GuardBot(commands.Bot):
         await self.site.start()
         logger.info("🌐 HTTP server started on port 5000")
 
+    def on_sigterm(self):
+        if self.close_task is None:
+            self.close_task = asyncio.create_task(self.close())
+
     @commands.Cog.listener()
     async def on_ready(self):
         await self.change_presence(activity=discord.CustomActivity("Ready to work!"))
         await self.tree.sync()
         logger.info(f"🤖 Bot {self.user} is ready!")
 
-        guilds = {}
-        for guild in self.guilds:
-            guilds[guild.id] = {
+        logger.opt(lazy=True).debug("Guilds: {}", lambda: {guild.id: guild.name for guild in self.guilds})
+
+    def guild_payload(self, guild: discord.Guild) -> dict:
+        if (payload := self.bot_guilds.get(guild.id)) is None:
+            payload = self.bot_guilds[guild.id] = {
+                "id": guild.id,
                 "name": guild.name,
+                "channel_ids": [channel.id for channel in guild.channels],
+                "channel_names": [channel.name for channel in guild.channels],
+                "member_ids": [member.id for member in guild.members],
+                "member_names": [member.name for member in guild.members],
             }
+        return payload
+
+    def invalidate_guild(self, guild: discord.Guild):
+        self.bot_guilds.pop(guild.id, None)
+
+    async def on_guild_available(self, guild):
+        self.invalidate_guild(guild)
+        self.guild_payload(guild)
 
-        logger.info(f"Guilds:\n{pformat(guilds)}")
+    async def on_guild_unavailable(self, guild):
+        self.invalidate_guild(guild)
+
+    async def on_guild_remove(self, guild):
+        self.invalidate_guild(guild)
+
+    async def on_guild_update(self, _, guild):
+        self.invalidate_guild(guild)
+
+    async def on_guild_channel_create(self, channel):
+        self.invalidate_guild(channel.guild)
+
+    async def on_guild_channel_delete(self, channel):
+        self.invalidate_guild(channel.guild)
+
+    async def on_guild_channel_update(self, _, channel):
+        self.invalidate_guild(channel.guild)
+
+    async def on_member_join(self, member):
+        self.invalidate_guild(member.guild)
+
+    async def on_member_remove(self, member):
+        self.invalidate_guild(member.guild)
+
+    async def on_user_update(self, before, after):
+        if before.name != after.name:
+            for guild in after.mutual_guilds:
+                self.invalidate_guild(guild)
 
     @staticmethod
     async def health_check(request):
-        logger.info(f"🌐 Health check request: {request}")
+        logger.debug("🌐 Health check request: {}", request)
         return web.json_response({"status": "ok"}, status=200)
 
     async def handle_send(self, request):
@@ -113,7 +186,7 @@ class GuardBot(commands.Bot):
 
         try:
             data = await request.json()
-            logger.info(f"request data:\n{pformat(data)}")
+            logger.debug("request data: {}", data)
             user_id = int(data["user_id"])
             server_id = int(data["server_id"])
             channel_id = int(data["channel_id"])
@@ -152,24 +225,27 @@ class GuardBot(commands.Bot):
         logger.info(f"Guild request: {request}")
 
         try:
-            request_data = await request.json()
-            guilds = request_data["guilds"]
-
-            approved_guild = {}
-
-            for guild in guilds:
-                if bot_guild := self.get_guild(int(guild["id"])):
-                    approved_guild[int(guild["id"])] = {
-                        "id": int(guild["id"]),
-                        "name": guild["name"],
-                        "guild": guild,
-                        "channels": {int(channel.id): {"id": int(channel.id), "name": channel.name} for channel in
-                                     bot_guild.channels},
-                        "members": {int(member.id): {"id": int(member.id), "name": member.name} for member in
-                                    bot_guild.members}
-                    }
+            request_data = await request.json(loads=orjson.loads)
+            user_id = int(request_data["user_id"])
 
-            return web.json_response({"success": "overhaul", "approved": json.dumps(approved_guild)}, status=200)
+            approved_guild = {
+                guild.id: self.guild_payload(guild)
+                for guild in self.guilds
+                if guild.get_member(user_id) is not None
+            }
+
+            # короткая карта id -> имя, чтобы бэкенд не разбирал весь ответ ради списка серверов
+            names = {guild_id: guild["name"] for guild_id, guild in approved_guild.items()}
+
+            return web.json_response(
+                {
+                    "success": "overhaul",
+                    "approved": orjson.dumps(approved_guild, option=orjson.OPT_NON_STR_KEYS).decode(),
+                    "names": names,
+                },
+                status=200,
+                dumps=lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode(),
+            )
 
         except Exception as e:
             logger.error(f"bot exception: {e}")
@@ -184,9 +260,12 @@ class GuardBot(commands.Bot):
             await self.app.shutdown()
             self.app.clear()
         logger.info("🛑 HTTP server stopped")
+        if self.http_session:
+            await self.http_session.close()
         await super().close()
 
 
 if __name__ == "__main__":
     BOT_TOKEN = os.getenv("BOT_TOKEN")
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
     GuardBot().run(BOT_TOKEN)
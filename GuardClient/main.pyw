@@ -1,21 +1,49 @@
-import json
+import asyncio
 import os.path
-from pprint import pformat
+import sys
+from pathlib import Path
 from typing import Self
-import time
-import webbrowser
 from threading import Thread
-from typing import Callable
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor
 
 import dearpygui.dearpygui as dpg
-import requests
+import httpx
+import orjson
 from loguru import logger
 from dotenv import load_dotenv
 
 load_dotenv()
 BACKEND_URL = os.getenv("BACKEND_URL")
 
+# как в бэкенде и боте: ответы целиком пишутся только на уровне DEBUG.
+# под pythonw sys.stderr равен None, тогда логирование отключено
+logger.remove()
+if sys.stderr:
+    logger.add(sys.stderr, level=os.getenv("LOG_LEVEL", "INFO"))
+
+# все запросы к бэкенду идут через один клиент в фоновом цикле событий
+_loop = asyncio.new_event_loop()
+Thread(target=_loop.run_forever, daemon=True).start()
+
+
+async def _create_client():
+    return httpx.AsyncClient(
+        base_url=BACKEND_URL,
+        timeout=3,
+        transport=httpx.AsyncHTTPTransport(
+            verify=False,
+            retries=1,
+            limits=httpx.Limits(max_connections=4, max_keepalive_connections=4),
+        ),
+    )
+
+
+_client = asyncio.run_coroutine_threadsafe(_create_client(), _loop).result()
+
+# пул для блокирующих вызовов, чтобы не создавать поток на каждое действие
+EXEC = ThreadPoolExecutor(max_workers=4, thread_name_prefix="guard")
+_loop.set_default_executor(EXEC)
+
 
 class Application:
     WIDTH = 600
@@ -24,14 +52,35 @@ class Application:
     instance: Self
 
     def __init__(self):
-        self.running = True
+        # событие остановки живёт в фоновом цикле: set() вызывается через call_soon_threadsafe
+        self.stop_event = asyncio.Event()
+        self.status_task = None
         self.main_window = None
 
-        self.http_server = None
-        self.server_thread = None
+        self.backend_status_text = None
+        self.bot_status_text = None
+        self.status_text = None
+        self.auth_panel = None
+        self.guild_panel = None
+        self.guild_combo = None
+        self.channel_panel = None
+        self.channel_combo = None
+        self.message_panel = None
+        self.input_text = None
+
+        # последние значения, выставленные через set_value
+        self.last_values = {}
+
+        self.auth_runner = None
+        self.auth_site = None
+
+        # ссылки на фоновые задачи цикла, чтобы их не собрал сборщик мусора до завершения
+        self.background_tasks = set()
 
         self.user_id = None
         self.guilds = {}
+        self.guilds_by_name = {}
+        self.guilds_by_id = {}
         self.selected_guild_id = None
         self.selected_channel_id = None
 
@@ -54,143 +103,168 @@ class Application:
         dpg.setup_dearpygui()
         dpg.show_viewport()
 
-        dpg.set_exit_callback(self.close)
-
     def setup_main_window(self):
-        with dpg.window(label="Main", width=Application.WIDTH, height=Application.HEIGHT) as self.main_window:
-            with dpg.group(horizontal=True):
-                dpg.add_text(tag="backend_status", default_value="Backand: <UNK>")
-                dpg.add_text(tag="bot_status", default_value="Bot: <UNK>")
+        # дерево виджетов строится через parent=, без контекстных менеджеров dpg
+        self.main_window = window = dpg.add_window(label="Main", width=Application.WIDTH, height=Application.HEIGHT)
 
-            dpg.add_text(tag="status", default_value="Status: Unauthorized")
+        status_row = dpg.add_group(parent=window, horizontal=True)
+        self.backend_status_text = dpg.add_text(parent=status_row, default_value="Backand: <UNK>")
+        self.bot_status_text = dpg.add_text(parent=status_row, default_value="Bot: <UNK>")
 
-            dpg.add_separator()
+        self.status_text = dpg.add_text(parent=window, default_value="Status: Unauthorized")
 
-            with dpg.group(tag="auth_panel", horizontal=True):
-                dpg.add_button(label="Login with Discord", callback=self.login_with_discord)
+        dpg.add_separator(parent=window)
 
-            dpg.add_separator()
+        self.auth_panel = dpg.add_group(parent=window, horizontal=True)
+        dpg.add_button(parent=self.auth_panel, label="Login with Discord", callback=self.login_with_discord)
 
-            with dpg.group(tag="guild_panel", show=False):
-                dpg.add_text("Select Discord server:")
-                dpg.add_combo(tag="guild_combo", width=300, callback=self.on_guild_selected)
+        dpg.add_separator(parent=window)
 
-            with dpg.group(tag="channel_panel", show=False):
-                dpg.add_text("Select Discord server:")
-                dpg.add_combo(tag="channel_combo", width=300, callback=self.on_channel_selected)
+        self.guild_panel = dpg.add_group(parent=window, show=False)
+        dpg.add_text("Select Discord server:", parent=self.guild_panel)
+        self.guild_combo = dpg.add_combo(parent=self.guild_panel, width=300, callback=self.on_guild_selected)
 
-            dpg.add_separator()
+        self.channel_panel = dpg.add_group(parent=window, show=False)
+        dpg.add_text("Select Discord server:", parent=self.channel_panel)
+        self.channel_combo = dpg.add_combo(parent=self.channel_panel, width=300, callback=self.on_channel_selected)
 
-            with dpg.group(tag="message_panel", show=False):
-                dpg.add_input_text(tag="input_text", width=500, hint="Enter message")
+        dpg.add_separator(parent=window)
 
-                with dpg.group(horizontal=True):
-                    dpg.add_button(label="Send", callback=lambda: self.thread_func(self.send_message))
-                    dpg.add_button(label="Save", callback=lambda: self.thread_func(self.save_message))
-                    dpg.add_button(label="Restore", callback=lambda: self.thread_func(self.reset_message))
-                    dpg.add_button(label="Get", callback=lambda: self.thread_func(self.get_message))
+        self.message_panel = dpg.add_group(parent=window, show=False)
+        self.input_text = dpg.add_input_text(parent=self.message_panel, width=500, hint="Enter message")
 
-            dpg.add_separator()
+        buttons = dpg.add_group(parent=self.message_panel, horizontal=True)
+        dpg.add_button(parent=buttons, label="Send", callback=lambda: self.run_async(self.send_message()))
+        dpg.add_button(parent=buttons, label="Save", callback=lambda: self.run_async(self.save_message()))
+        dpg.add_button(parent=buttons, label="Restore", callback=lambda: self.run_async(self.reset_message()))
+        dpg.add_button(parent=buttons, label="Get", callback=lambda: self.run_async(self.get_message()))
 
-            dpg.add_button(label="Exit", callback=self.exit_callback)
+        dpg.add_separator(parent=window)
 
-    def start_auth_server(self):
-        if self.http_server:
+        dpg.add_button(parent=window, label="Exit", callback=self.exit_callback)
+
+    async def start_auth_server(self):
+        if self.auth_runner:
             return
 
-        def run_server():
-            logger.info("🌐 Starting HTTP server...")
-            server_address = ('', 3000)
-            self.http_server = HTTPServer(server_address, AuthHandler)
-            self.http_server.app = self  # Для доступа к приложению из обработчика
-            logger.info("Auth server started on port 3000")
-            self.http_server.serve_forever()
+        # aiohttp.web нужен только на время авторизации, поэтому импортируется здесь
+        from aiohttp import web
+
+        logger.info("🌐 Starting HTTP server...")
+        app = web.Application()
+        app.router.add_get('/auth-success', self.auth_success)
 
-        self.thread_func(run_server)
+        self.auth_runner = web.AppRunner(app)
+        await self.auth_runner.setup()
+        self.auth_site = web.TCPSite(self.auth_runner, '', 3000)
+        await self.auth_site.start()
+        logger.info("Auth server started on port 3000")
 
-    def stop_auth_server(self):
+    async def stop_auth_server(self):
         """Останавливает HTTP-сервер"""
-        if self.http_server:
-            self.http_server.shutdown()
-            self.http_server.server_close()
-            self.http_server = None
+        if self.auth_runner:
+            await self.auth_site.stop()
+            await self.auth_runner.cleanup()
+            self.auth_site = None
+            self.auth_runner = None
             logger.info("Auth server stopped")
 
+    async def auth_success(self, request):
+        from aiohttp import web
+
+        task = asyncio.create_task(self.auth_callback(request.query.get('state', '')))
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+        return web.Response(
+            text='<html>'
+                 '<body><h1>Authentication successful! You can close this window.</h1></body>'
+                 '</html>',
+            content_type='text/html',
+        )
+
     def login_with_discord(self):
-        self.start_auth_server()
+        import webbrowser
+
+        self.run_async(self.start_auth_server())
 
-        webbrowser.open(f"{BACKEND_URL}/auth/login")
+        self.thread_func(lambda: webbrowser.open(f"{BACKEND_URL}/auth/login"))
 
-        dpg.set_value("status", "Status: Check your browser for Discord login")
+        self.set_value(self.status_text, "Status: Check your browser for Discord login")
 
-    def auth_callback(self, state):
-        logger.info("auth_callback: {}".format(state))
+    async def auth_callback(self, state):
+        logger.info("auth_callback: {}", state)
         try:
-            response = Request(
+            response = await Request(
                 Request.Method.Get,
-                f"{BACKEND_URL}/user/session?state={state}"
+                "/user/session",
+                params={"state": state}
             )
             resp = response.json()
-            logger.info(f"Auth callback: {response.status_code}, {type(resp)},\n{pformat(resp)}")
+            logger.info("Auth callback: {}", response.status_code)
+            logger.debug("Auth callback answer: {}", resp)
 
             if response.status_code == 200:
                 self.user_id = resp.get("user_id")
                 self.guilds = resp.get("guilds", {})
-
-                dpg.configure_item("auth_panel", show=False)
-                dpg.configure_item("guild_panel", show=True)
+                self.guilds_by_name = {g['name']: g for g in self.guilds.values()}
+                self.guilds_by_id = {int(g['id']): g for g in self.guilds.values()}
 
                 guild_names = [g['name'] for g in self.guilds.values()]
-                logger.info(f"guild_names: {guild_names}")
-                dpg.configure_item("guild_combo", items=guild_names)
+                logger.info("guild_names: {}", guild_names)
 
-                dpg.set_value("status", f"Status: Authorized ({resp.get('status', 'err')}) - {self.user_id}")
+                # все изменения интерфейса попадают в один кадр
+                with dpg.mutex():
+                    dpg.configure_item(self.auth_panel, show=False)
+                    dpg.configure_item(self.guild_panel, show=True)
+                    dpg.configure_item(self.guild_combo, items=guild_names)
+                    self.set_value(self.status_text, f"Status: Authorized ({resp.get('status', 'err')}) - {self.user_id}")
 
                 self.config.state = state
 
-                self.stop_auth_server()
+                await self.stop_auth_server()
             else:
-                logger.error(f"Failed to get session: {response.status_code}")
-                dpg.set_value(
-                    "status", f"Status: Auth failed ({response.status_code}): {resp.get('status', 'err')}"
+                logger.error("Failed to get session: {}", response.status_code)
+                self.set_value(
+                    self.status_text, f"Status: Auth failed ({response.status_code}): {resp.get('status', 'err')}"
                 )
         except Exception as e:
             logger.error(f"Auth check error: {e}")
 
     def on_guild_selected(self, _, app_data):
         selected_guild_name = app_data
-        for guild in self.guilds.values():
-            if guild['name'] == selected_guild_name:
-                self.selected_guild_id = int(guild['id'])
-                self.config.server_id = int(guild['id'])
-                dpg.set_value("status", f"Status: Selected server: {selected_guild_name}")
+        guild = self.guilds_by_name.get(selected_guild_name)
+        if guild is None:
+            return
 
-                guild_names = [c['name'] for c in guild["channels"].values()]
-                dpg.configure_item("channel_combo", items=guild_names)
+        self.selected_guild_id = int(guild['id'])
+        self.config.server_id = int(guild['id'])
 
-                dpg.configure_item("channel_panel", show=True)
-                break
+        with dpg.mutex():
+            self.set_value(self.status_text, f"Status: Selected server: {selected_guild_name}")
+            dpg.configure_item(self.channel_combo, items=guild["channel_names"])
+            dpg.configure_item(self.channel_panel, show=True)
 
     def on_channel_selected(self, _, app_data):
         selected_channel_name = app_data
-        for channel in self.guilds[str(self.selected_guild_id)]["channels"].values():
-            if channel['name'] == selected_channel_name:
-                self.selected_channel_id = int(channel['id'])
-                self.config.channel_id = int(channel['id'])
-                dpg.set_value("status", f"Status: Selected channel: {selected_channel_name}")
-                dpg.configure_item("message_panel", show=True)
+        guild = self.guilds_by_id[self.selected_guild_id]
+        for channel_id, channel_name in zip(guild["channel_ids"], guild["channel_names"]):
+            if channel_name == selected_channel_name:
+                self.selected_channel_id = int(channel_id)
+                self.config.channel_id = int(channel_id)
+                self.set_value(self.status_text, f"Status: Selected channel: {selected_channel_name}")
+                dpg.configure_item(self.message_panel, show=True)
                 break
 
-    def save_message(self):
+    async def save_message(self):
         if not self.user_id or not self.selected_guild_id:
-            dpg.set_value("status", "Status: Not authenticated or server not selected")
+            self.set_value(self.status_text, "Status: Not authenticated or server not selected")
             return
 
-        text = dpg.get_value("input_text")
+        text = dpg.get_value(self.input_text)
 
-        response = Request(
+        response = await Request(
             method=Request.Method.Post,
-            url=f"{BACKEND_URL}/message/save",
+            path="/message/save",
             data={
                 "user_id": self.user_id,
                 "server_id": self.selected_guild_id,
@@ -199,21 +273,22 @@ class Application:
         )
 
         resp = response.json()
-        logger.info(f"save: {response.status_code}, {type(resp)}, {resp}")
+        logger.info("save: {}", response.status_code)
+        logger.debug("save answer: {}", resp)
 
         if response.status_code == 200:
-            dpg.set_value("status", "Status: Message saved")
+            self.set_value(self.status_text, "Status: Message saved")
         else:
-            dpg.set_value("status", f"Status: Save failed ({response.status_code})")
+            self.set_value(self.status_text, f"Status: Save failed ({response.status_code})")
 
-    def reset_message(self):
+    async def reset_message(self):
         if not self.user_id or not self.selected_guild_id:
-            dpg.set_value("status", "Status: Not authenticated or server not selected")
+            self.set_value(self.status_text, "Status: Not authenticated or server not selected")
             return
 
-        response = Request(
+        response = await Request(
             method=Request.Method.Post,
-            url=f"{BACKEND_URL}/message/reset",
+            path="/message/reset",
             data={
                 "user_id": self.user_id,
                 "server_id": self.selected_guild_id,
@@ -221,28 +296,29 @@ class Application:
         )
 
         resp = response.json()
-        logger.info(f"reset: {response.status_code}, {type(resp)}, {resp}")
+        logger.info("reset: {}", response.status_code)
+        logger.debug("reset answer: {}", resp)
 
         if response.status_code == 200:
-            self.get_message()
-            dpg.set_value("status", f"Restore: {resp.get('status', 'err')}")
+            await self.get_message()
+            self.set_value(self.status_text, f"Restore: {resp.get('status', 'err')}")
         else:
-            dpg.set_value("status", f"Status: Resset failed ({response.status_code})")
+            self.set_value(self.status_text, f"Status: Resset failed ({response.status_code})")
 
-    def send_message(self):
+    async def send_message(self):
         if not self.user_id or not self.selected_guild_id:
-            dpg.set_value("status", "Status: Not authenticated")
+            self.set_value(self.status_text, "Status: Not authenticated")
             return
         if not self.selected_guild_id:
-            dpg.set_value("status", "Status: Server not selected")
+            self.set_value(self.status_text, "Status: Server not selected")
             return
         if not self.selected_guild_id:
-            dpg.set_value("status", "Status: Channel not selected")
+            self.set_value(self.status_text, "Status: Channel not selected")
             return
 
-        response = Request(
+        response = await Request(
             method=Request.Method.Post,
-            url=f"{BACKEND_URL}/message/send",
+            path="/message/send",
             data={
                 "user_id": self.user_id,
                 "server_id": self.selected_guild_id,
@@ -251,178 +327,204 @@ class Application:
         )
 
         resp = response.json()
-        logger.info(f"send: {response.status_code}, {type(resp)}, {resp}")
+        logger.info("send: {}", response.status_code)
+        logger.debug("send answer: {}", resp)
 
         if response.status_code == 200:
-            dpg.set_value("status", f"Sending: {resp.get('status', 'err')}")
+            self.set_value(self.status_text, f"Sending: {resp.get('status', 'err')}")
         else:
-            dpg.set_value("status", f"Status: Send failed ({response.status_code})")
+            self.set_value(self.status_text, f"Status: Send failed ({response.status_code})")
 
-    def get_message(self):
+    async def get_message(self):
         if not self.user_id or not self.selected_guild_id:
-            dpg.set_value("status", "Status: Not authenticated or server not selected")
+            self.set_value(self.status_text, "Status: Not authenticated or server not selected")
             return
 
-        response = Request(
+        response = await Request(
             method=Request.Method.Get,
-            url=f"{BACKEND_URL}/message/get",
-            data={
+            path="/message/get",
+            params={
                 "user_id": self.user_id,
                 "server_id": self.selected_guild_id,
             }
         )
 
         resp = response.json()
-        logger.info(f"get: {response.status_code}, {type(resp)}, {resp}")
+        logger.info("get: {}", response.status_code)
+        logger.debug("get answer: {}", resp)
 
         if response.status_code == 200:
-            dpg.set_value("input_text", resp.get("content", "err"))
-            dpg.set_value("status", f"Get: {resp.get('status', 'err')}")
+            dpg.set_value(self.input_text, resp.get("content", "err"))
+            self.set_value(self.status_text, f"Get: {resp.get('status', 'err')}")
         else:
-            dpg.set_value("status", f"Status: Get failed ({response.status_code})")
+            self.set_value(self.status_text, f"Status: Get failed ({response.status_code})")
+
+    def set_value(self, item, value):
+        if self.last_values.get(item) != value:
+            dpg.set_value(item, value)
+            self.last_values[item] = value
+
+    @staticmethod
+    def run_async(coro):
+        return asyncio.run_coroutine_threadsafe(coro, _loop)
 
     @staticmethod
     def thread_func(func):
-        Thread(target=func, daemon=True).start()
+        return EXEC.submit(func)
 
     def exit_callback(self):
         logger.info("exit")
-        self.running = False
+        _loop.call_soon_threadsafe(self.stop_event.set)
+        dpg.stop_dearpygui()
 
     def run(self):
-        self.thread_func(self.status_updater)
+        self.run_async(self.start_status_updater()).result()
 
         self.config.open()
 
         try:
             if self.config.state:
-                self.auth_callback(self.config.state)
+                self.run_async(self.auth_callback(self.config.state)).result()
                 logger.info("login")
 
                 if self.config.server_id:
-                    guild = None
-                    for guild in self.guilds:
-                        if guild["id"] == self.config.server_id:
-                            guild = guild
-                            break
+                    guild = self.guilds_by_id.get(self.config.server_id)
                     if guild:
-                        dpg.configure_item("guild_combo", default_value=guild["name"])
+                        # восстановление идёт тем же путём, что и ручной выбор: id, списки и панели
+                        self.on_guild_selected(None, guild["name"])
+                        dpg.configure_item(self.guild_combo, default_value=guild["name"])
 
                         channel = None
-                        for channel in self.guilds[self.config.server_id]["channels"]:
-                            if channel["id"] == self.config.channel_id:
-                                channel = channel
+                        for channel_id, channel_name in zip(guild["channel_ids"], guild["channel_names"]):
+                            if channel_id == self.config.channel_id:
+                                channel = channel_name
                                 break
                         if channel:
-                            dpg.configure_item("guild_combo", default_value=channel["name"])
+                            self.on_channel_selected(None, channel)
+                            dpg.configure_item(self.channel_combo, default_value=channel)
         except Exception as e:
-            dpg.set_value("status", f"Status: Error: {e}")
-
-        while self.running:
-            dpg.render_dearpygui_frame()
-
-    def status_updater(self):
-        while self.running:
-            self.update_status()
-            time.sleep(5)
-
-    @staticmethod
-    def update_status():
+            self.set_value(self.status_text, f"Status: Error: {e}")
+
+        dpg.start_dearpygui()
+        self.close()
+
+    async def start_status_updater(self):
+        self.status_task = asyncio.create_task(self.status_updater())
+
+    async def stop_status_updater(self):
+        """Останавливает опрос статуса и дожидается его завершения"""
+        self.stop_event.set()
+        if self.status_task:
+            # текущий запрос /test/status отменяется, а не дожидается таймаута
+            self.status_task.cancel()
+            await asyncio.gather(self.status_task, return_exceptions=True)
+            self.status_task = None
+
+    async def status_updater(self):
+        while not self.stop_event.is_set():
+            await self.update_status()
+            try:
+                # ожидание прерывается сразу, как только выставлено stop_event
+                await asyncio.wait_for(self.stop_event.wait(), 5)
+            except asyncio.TimeoutError:
+                pass
+
+    async def update_status(self):
         try:
-            response = Request(Request.Method.Get, f"{BACKEND_URL}/test/health")
-            backend_status = "OK" if response.status_code == 200 else "Error"
-            dpg.set_value("backend_status", f"Backend: {backend_status}")
-
+            response = await Request(Request.Method.Get, "/test/status")
             if response.status_code == 200:
                 logger.info("status - OK")
-                response = Request(Request.Method.Get, f"{BACKEND_URL}/test/test_bot")
-                bot_status = "OK" if response.status_code == 200 else "Error"
-                dpg.set_value("bot_status", f"Bot: {bot_status}")
-        except:
+                status = response.json()
+            else:
+                status = {"backend": "Error", "bot": "Error"}
+
+            self.set_value(self.backend_status_text, f"Backend: {status['backend']}")
+            self.set_value(self.bot_status_text, f"Bot: {status['bot']}")
+        except Exception:
             logger.exception("status - Unavailable")
-            dpg.set_value("backend_status", "Backend: Unavailable")
-            dpg.set_value("bot_status", "Bot: Unavailable")
+            self.set_value(self.backend_status_text, "Backend: Unavailable")
+            self.set_value(self.bot_status_text, "Bot: Unavailable")
 
     def close(self):
-        self.running = False
+        # опрос статуса пишет в интерфейс, поэтому он должен завершиться до destroy_context
+        self.run_async(self.stop_status_updater()).result()
         self.config.save()
 
         dpg.destroy_context()
-        self.stop_auth_server()
+        self.run_async(self.stop_auth_server()).result()
+        self.run_async(_client.aclose()).result()
+        EXEC.shutdown(wait=False, cancel_futures=True)
 
 
 class Config:
+    PATH = Path("cfg.json")
+
+    __slots__ = ("state", "server_id", "channel_id")
+
     def __init__(self):
         self.state = None
         self.server_id = None
         self.channel_id = None
 
-        if not os.path.exists("cfg.json"):
-            with open("cfg.json", "w") as f:
-                json.dump({}, f)
-
     def open(self):
-        with open("cfg.json", "r") as f:
-            data = json.load(f)
-            self.state = data.get("status")
-            self.server_id = data.get("server_id")
-            self.channel_id = data.get("channel_id")
+        try:
+            data = orjson.loads(Config.PATH.read_bytes())
+        except FileNotFoundError:
+            return
+
+        self.state = data.get("status")
+        self.server_id = data.get("server_id")
+        self.channel_id = data.get("channel_id")
 
     def save(self):
-        with open("cfg.json", "w") as f:
-            data = {
-                "status": self.state,
-                "server_id": self.server_id,
-                "channel_id": self.channel_id,
-            }
-            json.dump(data, f)
+        # пишем во временный файл и подменяем, чтобы сбой не оставил cfg.json пустым
+        tmp = Config.PATH.with_suffix(".json.tmp")
+        tmp.write_bytes(orjson.dumps({
+            "status": self.state,
+            "server_id": self.server_id,
+            "channel_id": self.channel_id,
+        }))
+        tmp.replace(Config.PATH)
 
 
 class Request:
     class Method:
-        __session = requests.Session()
-        __session.verify = False
+        Get = "GET"
+        Post = "POST"
+        Put = "PUT"
 
-        Get = __session.get
-        Post = __session.post
-        Put = __session.put
+    __slots__ = ("method", "path", "data", "params", "response", "status_code", "body")
 
-    def __init__(self, method: Callable | Method, url, data={}):
+    def __init__(self, method: str, path, data=None, params=None):
+        self.method = method
+        self.path = path
+        self.data = data
+        self.params = params
         self.response = None
+        self.status_code = 500
+        self.body = {}
+
+    def __await__(self):
+        return self.send().__await__()
+
+    async def send(self):
         try:
-            self.response = method(url, json=data)
+            # без data запрос уходит без тела и Content-Type
+            self.response = await _client.request(self.method, self.path, json=self.data, params=self.params)
         except Exception as e:
             logger.exception("error in request", str(e))
+            return self
 
-    @property
-    def status_code(self):
-        return self.response.status_code if self.response else 500
+        # статус и тело разбираются один раз, дальше json() отдаёт готовый результат
+        self.status_code = self.response.status_code
+        try:
+            self.body = orjson.loads(self.response.content)
+        except orjson.JSONDecodeError:
+            self.body = {}
+        return self
 
     def json(self):
-        return self.response.json() if self.response else {}
-
-
-class AuthHandler(BaseHTTPRequestHandler):
-    def do_GET(self):
-        if self.path.startswith('/auth-success'):
-            # Извлекаем параметры из URL
-            params = {}
-            if '?' in self.path:
-                query = self.path.split('?')[1]
-                params = dict(qc.split('=') for qc in query.split('&'))
-
-            self.send_response(200)
-            self.send_header('Content-type', 'text/html')
-            self.end_headers()
-            self.wfile.write(
-                b'<html>'
-                b'<body><h1>Authentication successful! You can close this window.</h1></body>'
-                b'</html>'
-            )
-
-            Application.instance.auth_callback(params.get('state', ''))
-        else:
-            self.send_error(404, "Not Found")
+        return self.body
 
 
 if __name__ == "__main__":